@@ -1,6 +1,7 @@
 # config.py
 """Configuration constants and paths for the Streamlit application."""
 
+import tempfile
 from pathlib import Path
 
 FRAME_LABELS = [
@@ -28,3 +29,6 @@ LABEL_FILE_PATH = BASE_DIR / "data" / "labels.csv"
 
 ARTIFACTS_FOLDER = BASE_DIR / "artifacts"
 """Path: Directory for storing generated artifacts."""
+
+DUCKDB_TEMP_DIR = Path(tempfile.gettempdir()) / "duckdb_spill"
+"""Path: Directory DuckDB spills to when a query exceeds its memory limit."""
@@ -1,16 +1,24 @@
 # data_manager.py
 """Data management and processing operations for the Streamlit application."""
 
+import csv
+import io
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Container, Dict, Iterable, List, Mapping, Optional, cast
 
 import duckdb
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 import streamlit as st
 
-from config import ARTIFACTS_FOLDER, FRAME_LABELS, LABEL_FILE_PATH
+from config import ARTIFACTS_FOLDER, DUCKDB_TEMP_DIR, FRAME_LABELS, LABEL_FILE_PATH
 from data_utils import copy_src_imgs_to_dst
 
+LABEL_DTYPE = pd.CategoricalDtype(FRAME_LABELS)
+"""pd.CategoricalDtype: Dtype of the ``label`` column."""
+
 
 class DataManager:
     """Class encapsulating data management and processing operations."""
@@ -22,8 +30,11 @@ class DataManager:
         Sets up default values for various session state variables including:
         - DataFrames (df, current_df)
         - Display configurations (display_types, labels)
+        - Frame labels and their edit and save state (frame_labels,
+          label_edits, labels_dirty)
         - Pagination settings (current_page, rows_per_page)
-        - SQL configurations (sql_query, new_col_sql)
+        - Sort settings and the cached row order (sort_column, sort_order)
+        - SQL configurations (sql_query, new_col_sql, duck_conn, sql_cache)
         """
         session_defaults: Dict[str, Any] = {
             "df": None,
@@ -35,11 +46,16 @@ class DataManager:
             "page": "Data Upload & Configuration",
             "sort_column": None,
             "sort_ascending": True,
+            "sort_order": None,
             "sql_query": "SELECT img_cache, frame_id, label FROM current_df",
             "new_col_sql": "SELECT *, salary*2 AS bonus FROM current_df",
             "uploaded_file": None,
             "frame_labels": {},
+            "label_edits": 0,
+            "labels_dirty": False,
             "model_versions": [],
+            "duck_conn": None,
+            "sql_cache": None,
         }
         for key, value in session_defaults.items():
             if key not in st.session_state:
@@ -59,21 +75,59 @@ class DataManager:
         """
         if uploaded_file and uploaded_file != st.session_state.uploaded_file:
             if LABEL_FILE_PATH.exists():
-                label_df = pd.read_csv(LABEL_FILE_PATH)
-                st.session_state.frame_labels = dict(
-                    zip(label_df["uuid"], label_df["label"])
+                st.session_state.frame_labels = DataManager.load_frame_labels(
+                    LABEL_FILE_PATH.stat().st_mtime
                 )
 
-            st.session_state.df = pd.read_csv(uploaded_file)
+            st.session_state.df = DataManager.load_csv(uploaded_file.getvalue())
             DataManager.init_model_versions()
             DataManager.init_frame_labels()
 
-            st.session_state.current_df = st.session_state.df.copy()
+            DataManager.copy_original_to_current()
+            # Drop the previous upload's frames held by the result caches
+            st.session_state.sql_cache = None
+            st.session_state.sort_order = None
             st.session_state.display_types = {}
             st.session_state.labels = {}
-            st.session_state.current_page = 1
             st.session_state.uploaded_file = uploaded_file
 
+    @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=2)  # type: ignore[misc]
+    def load_csv(raw_bytes: bytes) -> pd.DataFrame:
+        """Parse uploaded CSV bytes, cached on the content hash.
+
+        Only the last uploads are kept, as the cache stores a pickled copy
+        of each parsed table and every hit unpickles another one. Arrow
+        string columns avoid building a Python object per cell.
+
+        Args:
+            raw_bytes: Raw contents of the uploaded CSV file
+
+        Returns:
+            pd.DataFrame: Parsed DataFrame with Arrow-backed dtypes
+        """
+        return pd.read_csv(
+            io.BytesIO(raw_bytes), engine="pyarrow", dtype_backend="pyarrow"
+        )
+
+    @staticmethod
+    @st.cache_data(show_spinner=False, max_entries=1)  # type: ignore[misc]
+    def load_frame_labels(mtime: float) -> Dict[str, str]:
+        """Load stored frame labels, cached until the label file changes.
+
+        Args:
+            mtime: Modification time of the label file, used as cache key
+
+        Returns:
+            Dict[str, str]: Mapping from frame uuid to label
+        """
+        convert_options = pacsv.ConvertOptions(
+            column_types={"uuid": pa.string(), "label": pa.string()}
+        )
+        label_table = pacsv.read_csv(LABEL_FILE_PATH, convert_options=convert_options)
+        uuids = label_table["uuid"].to_pylist()
+        return dict(zip(uuids, label_table["label"].to_pylist()))
+
     @staticmethod
     def init_model_versions() -> None:
         """Initialize model versions from the uploaded DataFrame.
@@ -93,27 +147,239 @@ class DataManager:
     @staticmethod
     def init_frame_labels() -> None:
         """Initialize frame labels from historical data or default values."""
-        st.session_state.df["label"] = FRAME_LABELS[0]
-        for r_idx, row in st.session_state.df.iterrows():
-            frame_uuid = DataManager.get_frame_uuid(row)
-            if frame_uuid in st.session_state.frame_labels:
-                st.session_state.df.at[r_idx, "label"] = st.session_state.frame_labels[
-                    frame_uuid
-                ]
+        df = st.session_state.df
+        df["_frame_uuid"] = DataManager.frame_uuids(df)
+        df["label"] = DataManager.lookup_labels(df).fillna(FRAME_LABELS[0])
+
+    @staticmethod
+    def frame_uuids(df: pd.DataFrame) -> pd.Series:
+        """Get the unique frame identifier of every row.
+
+        Args:
+            df: DataFrame with a ``_frame_uuid`` or frame ID column
+
+        Returns:
+            pd.Series: Frame uuid per row
+        """
+        if "_frame_uuid" in df.columns:
+            return df["_frame_uuid"]
+        prefix = "_".join(st.session_state.model_versions) + "_"
+        return prefix + df[DataManager.get_frame_id_column(df.columns)].astype(str)
+
+    @staticmethod
+    def lookup_labels(df: pd.DataFrame) -> pd.Series:
+        """Look up the stored frame label of every row.
+
+        Args:
+            df: DataFrame with a ``_frame_uuid`` or frame ID column
+
+        Returns:
+            pd.Series: Categorical labels, missing for frames without a label
+        """
+        labels = DataManager.frame_uuids(df).map(st.session_state.frame_labels)
+        return labels.astype(LABEL_DTYPE)
+
+    @staticmethod
+    def current_labels(df: pd.DataFrame) -> pd.Series:
+        """Get the ``label`` column with the edits recorded in frame_labels.
+
+        Label edits only go to ``frame_labels``, so the column itself holds
+        the labels from load time. Frames that cannot be identified keep
+        their column value, and a column holding values other than
+        FRAME_LABELS, e.g. from a SQL expression, is returned unchanged.
+
+        Args:
+            df: DataFrame with a ``label`` column
+
+        Returns:
+            pd.Series: Categorical labels including the edits
+        """
+        labels = DataManager.as_label_dtype(df["label"])
+        if labels.dtype != LABEL_DTYPE or not DataManager.has_frame_uuid(df.columns):
+            return labels
+        return DataManager.lookup_labels(df).fillna(labels)
+
+    @staticmethod
+    def as_label_dtype(labels: pd.Series) -> pd.Series:
+        """Convert labels to LABEL_DTYPE if all of them are FRAME_LABELS.
+
+        Args:
+            labels: Label values
+
+        Returns:
+            pd.Series: Categorical labels, or ``labels`` itself if any
+            non-missing value is not one of FRAME_LABELS
+        """
+        if not labels.dropna().isin(FRAME_LABELS).all():
+            return labels
+        return labels.astype(LABEL_DTYPE)
+
+    @staticmethod
+    def with_current_labels(df: pd.DataFrame) -> pd.DataFrame:
+        """Return the DataFrame with its ``label`` column brought up to date.
+
+        Args:
+            df: DataFrame, with or without a ``label`` column
+
+        Returns:
+            pd.DataFrame: New frame with current labels, or ``df`` itself if
+            it has no ``label`` column
+        """
+        if "label" not in df.columns:
+            return df
+        return df.assign(label=DataManager.current_labels(df))
+
+    @staticmethod
+    def get_frame_id_column(columns: Container[str]) -> str:
+        """Resolve the frame ID column of a single or combined table.
+
+        Args:
+            columns: Column names of the DataFrame or keys of a row
+
+        Returns:
+            str: ``frame_id`` if present, otherwise the first model's ``frame_id_0``
+        """
+        return "frame_id" if "frame_id" in columns else "frame_id_0"
+
+    @staticmethod
+    def visible_columns(columns: Iterable[str]) -> List[str]:
+        """Drop the internal ``_frame_uuid`` helper column from a column list.
+
+        Args:
+            columns: Column names of the DataFrame
+
+        Returns:
+            List[str]: Column names to show to the user
+        """
+        return [col for col in columns if col != "_frame_uuid"]
 
     @staticmethod
-    def get_frame_uuid(row: pd.Series) -> str:
+    def has_frame_uuid(columns: Container[str]) -> bool:
+        """Check whether frames can be identified from the given columns.
+
+        Args:
+            columns: Column names of the DataFrame or keys of a row
+
+        Returns:
+            bool: True if a ``_frame_uuid`` or frame ID column is present
+        """
+        return (
+            "_frame_uuid" in columns
+            or DataManager.get_frame_id_column(columns) in columns
+        )
+
+    @staticmethod
+    def get_frame_uuid(row: Mapping[str, Any]) -> str:
         """Generate unique frame identifier.
 
+        Uses the ``_frame_uuid`` column precomputed by ``init_frame_labels``
+        when the row still carries it, e.g. after a ``SELECT *`` query.
+
         Args:
-            row: DataFrame row containing frame information
+            row: DataFrame row or column-to-value mapping of one frame
 
         Returns:
             str: Unique identifier string combining model versions and frame ID
         """
-        frame_id = str(row["frame_id"])
+        if "_frame_uuid" in row:
+            return str(row["_frame_uuid"])
+        frame_id = str(row[DataManager.get_frame_id_column(row)])
         return "_".join(st.session_state.model_versions + [frame_id])
 
+    @staticmethod
+    @st.cache_resource  # type: ignore[misc]
+    def get_duck_db() -> duckdb.DuckDBPyConnection:
+        """Return the process-wide in-memory DuckDB database.
+
+        Results that do not fit in memory spill to the system temp
+        directory rather than the working directory.
+
+        Returns:
+            duckdb.DuckDBPyConnection: Connection owning the shared database
+        """
+        return duckdb.connect(
+            ":memory:", config={"temp_directory": str(DUCKDB_TEMP_DIR)}
+        )
+
+    @staticmethod
+    def get_duck_conn() -> duckdb.DuckDBPyConnection:
+        """Return the session's DuckDB connection, creating it on first use.
+
+        The cursor shares the cached database but keeps its own registered
+        views, so concurrent sessions cannot overwrite each other's frames.
+
+        Returns:
+            duckdb.DuckDBPyConnection: Persistent connection for this session
+        """
+        if st.session_state.duck_conn is None:
+            st.session_state.duck_conn = DataManager.get_duck_db().cursor()
+        return cast(duckdb.DuckDBPyConnection, st.session_state.duck_conn)
+
+    @staticmethod
+    def run_sql(query: Optional[str], df: pd.DataFrame) -> pd.DataFrame:
+        """Run SQL against a DataFrame exposed to DuckDB as ``current_df``.
+
+        DuckDB scans the registered frame in place and only reads the
+        columns the query references. The frame is unregistered afterwards
+        so the persistent connection does not keep superseded DataFrames
+        alive.
+
+        Args:
+            query: SQL query string to execute
+            df: DataFrame to expose as ``current_df``, with its labels
+                updated from frame_labels
+
+        Returns:
+            pd.DataFrame: Query result with Arrow-backed dtypes and a
+            categorical ``label`` column if it only holds FRAME_LABELS
+        """
+        conn = DataManager.get_duck_conn()
+        # Queries filter and sort on the labels as edited, not as loaded
+        conn.register("current_df", DataManager.with_current_labels(df))
+        try:
+            table = conn.execute(query).fetch_arrow_table()
+        finally:
+            conn.unregister("current_df")
+        result = cast(pd.DataFrame, table.to_pandas(types_mapper=pd.ArrowDtype))
+        # DuckDB hands categoricals back as strings; restore the label codes
+        if "label" in result.columns:
+            result["label"] = DataManager.as_label_dtype(result["label"])
+        return result
+
+    @staticmethod
+    def sorted_positions(sort_key: pd.Series, ascending: bool) -> np.ndarray:
+        """Compute the row order of a sorted column with DuckDB.
+
+        Only the sort column is sorted. Ties keep their original order and
+        missing values sort last, as with a stable pandas sort. Categoricals
+        are ordered by their categories.
+
+        Args:
+            sort_key: Column to sort by
+            ascending: Sort direction
+
+        Returns:
+            np.ndarray: Row positions in sorted order
+        """
+        if isinstance(sort_key.dtype, pd.CategoricalDtype):
+            codes = sort_key.cat.codes.to_numpy()
+            key_array = pa.array(codes, mask=codes < 0)
+        else:
+            key_array = pa.array(sort_key)
+        key_table = pa.table(
+            {"sort_key": key_array, "pos": np.arange(len(sort_key), dtype=np.int64)}
+        )
+        direction = "ASC" if ascending else "DESC"
+        conn = DataManager.get_duck_conn()
+        conn.register("sort_keys", key_table)
+        try:
+            result = conn.execute(
+                f"SELECT pos FROM sort_keys ORDER BY sort_key {direction} NULLS LAST, pos"
+            ).fetchnumpy()
+        finally:
+            conn.unregister("sort_keys")
+        return np.asarray(result["pos"], dtype=np.int64)
+
     @staticmethod
     def apply_sql_query(query: Optional[str]) -> None:
         """Apply SQL query to the current DataFrame.
@@ -125,10 +391,19 @@ class DataManager:
             duckdb.Error: If there's an error in the SQL query
         """
         try:
-            DataManager.copy_original_to_current()
-            conn = duckdb.connect()
-            conn.register("current_df", st.session_state.current_df)
-            result = conn.execute(query).fetchdf()
+            # Re-applying the same query to the same upload reuses the result
+            # until a label edit changes what the query sees
+            cache_key = (query, st.session_state.label_edits)
+            cached = st.session_state.sql_cache
+            if (
+                cached is not None
+                and cached[0] == cache_key
+                and cached[1] is st.session_state.df
+            ):
+                result = cached[2]
+            else:
+                result = DataManager.run_sql(query, st.session_state.df)
+                st.session_state.sql_cache = (cache_key, st.session_state.df, result)
             st.session_state.current_df = result
             st.session_state.current_page = 1
         except Exception as e:
@@ -145,18 +420,21 @@ class DataManager:
             duckdb.Error: If there's an error in the SQL query
         """
         try:
-            conn = duckdb.connect()
-            conn.register("current_df", st.session_state.current_df)
-            new_df = conn.execute(query).fetchdf()
-            st.session_state.current_df = new_df
+            st.session_state.current_df = DataManager.run_sql(
+                query, st.session_state.current_df
+            )
             st.session_state.current_page = 1
         except Exception as e:
             st.error(f"Column Error: {str(e)}")
 
     @staticmethod
     def copy_original_to_current() -> None:
-        """Reset current DataFrame to original uploaded data."""
-        st.session_state.current_df = st.session_state.df.copy()
+        """Reset current DataFrame to original uploaded data.
+
+        With copy-on-write enabled the shallow copy shares data with the
+        original until either frame is modified.
+        """
+        st.session_state.current_df = st.session_state.df.copy(deep=False)
         st.session_state.current_page = 1
 
     @staticmethod
@@ -168,13 +446,24 @@ class DataManager:
             file_name: The file name of the table.
 
         Processes:
-        1. Splits image paths into separate columns
-        2. Adds destination paths for images
-        3. Copies images to destination folder
-        4. Saves processed DataFrame to CSV
+        1. Flushes unsaved frame labels
+        2. Updates the label column with the edited frame labels
+        3. Splits image paths into separate columns
+        4. Adds destination paths for images
+        5. Copies images to destination folder
+        6. Saves processed DataFrame to CSV
+
+        The Arrow CSV writer is used when it yields the same values as
+        pandas ``to_csv``. It always quotes strings, which readers parse to
+        the same values.
         """
+        DataManager.flush_frame_labels()
         dst_img_folder = ARTIFACTS_FOLDER / "important_imgs"
-        processed_df = df.copy()
+        # Under copy-on-write the new frame shares the caller's data, and
+        # derived columns stay off the caller's frame
+        processed_df = df.drop(columns="_frame_uuid", errors="ignore")
+        if "label" in df.columns:
+            processed_df["label"] = DataManager.current_labels(df)
         processed_df = DataManager.split_img_paths(processed_df)
         processed_df = DataManager.add_img_dst_paths(processed_df, dst_img_folder)
 
@@ -184,9 +473,35 @@ class DataManager:
             )
 
         csv_path = ARTIFACTS_FOLDER / file_name
-        processed_df.to_csv(csv_path, index=False)
+        table = pa.Table.from_pandas(processed_df, preserve_index=False)
+        if any(DataManager.needs_pandas_csv(field.type) for field in table.schema):
+            processed_df.to_csv(csv_path, index=False)
+        else:
+            pacsv.write_csv(table, csv_path)
         st.success(f"CSV saved to {csv_path}. Images copied to {dst_img_folder}")
 
+    @staticmethod
+    def needs_pandas_csv(arrow_type: pa.DataType) -> bool:
+        """Check whether a column must be written with pandas ``to_csv``.
+
+        The Arrow CSV writer rejects nested columns, and writes whole-number
+        floats as ``0`` and booleans as ``true``/``false`` where pandas
+        writes ``0.0`` and ``True``/``False``.
+
+        Args:
+            arrow_type: Arrow type of the column
+
+        Returns:
+            bool: True if the Arrow writer cannot reproduce the pandas output
+        """
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        return bool(
+            pa.types.is_nested(arrow_type)
+            or pa.types.is_floating(arrow_type)
+            or pa.types.is_boolean(arrow_type)
+        )
+
     @staticmethod
     def split_img_paths(df: pd.DataFrame) -> pd.DataFrame:
         """Split comma-separated image paths into separate columns.
@@ -197,10 +512,8 @@ class DataManager:
         Returns:
             pd.DataFrame: Modified DataFrame with split image paths
         """
-        for r_idx, row in df.iterrows():
-            img_paths = row["img_cache"].split(",")
-            for i, img_path in enumerate(img_paths):
-                df.at[r_idx, f"img_cache_{i}"] = img_path
+        parts = df["img_cache"].str.split(",", expand=True).add_prefix("img_cache_")
+        df[parts.columns] = parts
         return df
 
     @staticmethod
@@ -214,16 +527,26 @@ class DataManager:
         Returns:
             pd.DataFrame: Modified DataFrame with destination paths
         """
+        frame_str = df["frame_id"].astype("string[pyarrow]")
+        dst_prefix = str(dst_folder) + "/"
         for i, model_version in enumerate(st.session_state.model_versions):
-            df[f"img_uuid_{i}"] = model_version + "_" + df["frame_id"].astype(str)
-            df[f"img_dst_{i}"] = dst_folder / (df[f"img_uuid_{i}"] + ".png")
+            img_uuid = (model_version + "_") + frame_str
+            df[f"img_uuid_{i}"] = img_uuid
+            df[f"img_dst_{i}"] = dst_prefix + img_uuid + ".png"
         return df
 
     @staticmethod
     def save_frame_labels() -> None:
         """Save current frame labels to CSV file."""
         LABEL_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        df = pd.DataFrame(
-            list(st.session_state.frame_labels.items()), columns=["uuid", "label"]
-        )
-        df.to_csv(LABEL_FILE_PATH, index=False)
+        with open(LABEL_FILE_PATH, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow(("uuid", "label"))
+            writer.writerows(st.session_state.frame_labels.items())
+        st.session_state.labels_dirty = False
+
+    @staticmethod
+    def flush_frame_labels() -> None:
+        """Save frame labels if they changed since the last save."""
+        if st.session_state.labels_dirty:
+            DataManager.save_frame_labels()
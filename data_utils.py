@@ -1,7 +1,9 @@
 import json
 import os
 import shutil
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Iterable, Optional, Tuple
 
 import pandas as pd
 from tqdm import tqdm
@@ -21,11 +23,15 @@ def wandb_table_to_csv(
     # Convert to pandas DataFrame
     columns = data["columns"]
     rows = data["data"]
-    for row in rows:
-        img_pred = row[img_column_idx]
-        if isinstance(img_pred, dict) and img_pred.get("_type") == "image-file":
-            row[img_column_idx] = os.path.join(artifact_dir, img_pred["path"])
     df = pd.DataFrame(rows, columns=columns)
+    # Replace image-file dicts with their paths inside the artifact dir
+    img_col = df.iloc[:, img_column_idx]
+    is_img = img_col.map(
+        lambda v: isinstance(v, dict) and v.get("_type") == "image-file"
+    ).to_numpy(dtype=bool)
+    if is_img.any():
+        img_paths = img_col[is_img].str.get("path")
+        df.iloc[is_img, img_column_idx] = os.path.join(artifact_dir, "") + img_paths
     # Export to CSV
     df.to_csv(os.path.join(artifact_dir, csv_name), index=False)
 
@@ -46,25 +52,91 @@ def download_files(
     return artifact_dir
 
 
-def copy_src_imgs_to_dst(img_src_paths: str, img_dst_paths: str) -> None:
+def _copy_file(src_path: str, dst_path: str) -> None:
     """
-    Copy images from the source path (df[img_column_name]) to the cache path (df[cache_img_column_name]).
+    Copy file contents with copy_file_range where available.
+
+    copy_file_range keeps the data in the kernel (and can reflink on
+    filesystems that support it). Falls back to shutil.copyfile, which
+    uses sendfile on Linux, on other platforms or when the call fails,
+    e.g. across filesystems on older kernels. Some virtual filesystems
+    report zero bytes copied before the end of the file instead of
+    failing; those copies fall back as well.
 
     Args:
-        df (pd.DataFrame): The DataFrame containing image paths.
-        img_column_name (str): The column name for source image paths.
-        cache_img_column_name (str): The column name for cache image paths.
+        src_path (str): The source file path.
+        dst_path (str): The destination file path.
     """
-    for src_path, dst_path in tqdm(zip(img_src_paths, img_dst_paths)):
-        if os.path.exists(dst_path):
-            continue
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(src_path, "rb") as fsrc, open(dst_path, "wb") as fdst:
+                size = remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            # A size of 0 may also come from a virtual file with content
+            if size > 0 and remaining == 0:
+                return
+        except OSError:
+            pass
+    shutil.copyfile(src_path, dst_path)
+
 
-        # Ensure the source image exists
-        if not os.path.exists(src_path):
+def _copy_img(paths: Tuple[str, str], force: bool = False) -> None:
+    src_path, dst_path = paths
+    try:
+        dst_stat: Optional[os.stat_result] = os.stat(dst_path)
+    except FileNotFoundError:
+        dst_stat = None
+
+    # Ensure the source image exists
+    try:
+        src_stat = os.stat(src_path)
+    except FileNotFoundError:
+        if dst_stat is None:
             print(f"Warning: Source image not found: {src_path}")
-            continue
+        return
+
+    if dst_stat is not None:
+        # Opening dst for writing would truncate the source itself
+        if (dst_stat.st_dev, dst_stat.st_ino) == (src_stat.st_dev, src_stat.st_ino):
+            return
+        # Skip images already copied in full by a previous run
+        if not force and dst_stat.st_size == src_stat.st_size:
+            return
+
+    _copy_file(src_path, dst_path)
+
+
+def copy_src_imgs_to_dst(
+    img_src_paths: Iterable[str], img_dst_paths: Iterable[str], force: bool = False
+) -> None:
+    """
+    Copy images from the source paths to the destination paths.
+
+    Copies are I/O-bound, so they are dispatched to a thread pool. Images whose
+    destination already exists with the same size are skipped unless forced.
+
+    Args:
+        img_src_paths (Iterable[str]): The source image paths.
+        img_dst_paths (Iterable[str]): The destination image paths.
+        force (bool): Re-copy images even if the destination is up to date.
+    """
+    # Drop repeated pairs so two workers never write the same destination
+    pairs = list(
+        dict.fromkeys(
+            (str(src), str(dst)) for src, dst in zip(img_src_paths, img_dst_paths)
+        )
+    )
+
+    # Create the destination directories once instead of once per image
+    dst_dirs = {os.path.dirname(dst_path) for _, dst_path in pairs}
+    for dst_dir in dst_dirs - {""}:
+        os.makedirs(dst_dir, exist_ok=True)
 
-        # Create the cache directory if it doesn't exist
-        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-        # Copy the image from source to cache
-        shutil.copy(src_path, dst_path)
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        copy_img = partial(_copy_img, force=force)
+        list(tqdm(executor.map(copy_img, pairs), total=len(pairs)))
@@ -19,13 +19,14 @@ def combine_tables(
     df_list: list[pd.DataFrame], cache_img_column_name: str, metrics_for_diff: str
 ) -> pd.DataFrame:
     assert len(df_list) == 2
-    df_combined = pd.concat(df_list, axis=1, keys=[0, 1])
-    df_combined.columns = [f"{col[1]}_{col[0]}" for col in df_combined.columns]
+    df_combined = pd.concat(
+        [df_list[0].add_suffix("_0"), df_list[1].add_suffix("_1")], axis=1
+    )
     # Combine cache image paths from both DataFrames
-    df_combined[f"{cache_img_column_name}"] = (
-        df_list[0][cache_img_column_name].astype(str)
-        + ","
-        + df_list[1][cache_img_column_name].astype(str)
+    df_combined[cache_img_column_name] = (
+        df_list[0][cache_img_column_name]
+        .astype(str)
+        .str.cat(df_list[1][cache_img_column_name].astype(str), sep=",")
     )
 
     # Calculate the difference between metrics in the two DataFrames
@@ -88,6 +89,12 @@ def get_args() -> Namespace:
         default="predictions_table.table.json",
         help="Table name",
     )
+    parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Re-copy cached images even if they are already present",
+    )
     args = parser.parse_args()
     return args
 
@@ -109,15 +116,15 @@ def main() -> None:
         model_artifact_dir = os.path.join(artifact_root_dir, model_version)
 
         csv_path = os.path.join(artifact_dir, csv_name)
+        parquet_path = os.path.splitext(csv_path)[0] + ".parquet"
 
-        if os.path.exists(csv_path):
-            df = pd.read_csv(csv_path)
+        if os.path.exists(parquet_path):
+            df = pd.read_parquet(parquet_path, dtype_backend="pyarrow")
         else:
             wandb_table_to_csv(
                 artifact_dir, table_name, csv_name, img_column_idx=args.img_column_idx
             )
-            df = pd.read_csv(csv_path)
-            img_column_name = df.columns[args.img_column_idx]
+            df = pd.read_csv(csv_path, engine="pyarrow", dtype_backend="pyarrow")
             assert (
                 "frame_id" in df.columns
             ), "Error: 'frame_id' column is missing in the DataFrame."
@@ -125,12 +132,16 @@ def main() -> None:
                 lambda x: os.path.join(model_artifact_dir, "media", f"{x}.png")
             )
             df["model_version"] = model_version
-            df.to_csv(csv_path, index=False)
-
-            if not all_exist(df[cache_img_column_name]):
-                download_files(args.entity, args.project, run_id, path_prefix="media/")
-                # copy imgs from df[img_column_name] to df[cache_img_column_name]
-                copy_src_imgs_to_dst(df[img_column_name], df[cache_img_column_name])
+            df.to_parquet(parquet_path, compression="zstd")
+
+        # The cached table keeps the source image column at the same position
+        img_column_name = df.columns[args.img_column_idx]
+        if args.force or not all_exist(df[cache_img_column_name]):
+            download_files(args.entity, args.project, run_id, path_prefix="media/")
+            # copy imgs from df[img_column_name] to df[cache_img_column_name]
+            copy_src_imgs_to_dst(
+                df[img_column_name], df[cache_img_column_name], force=args.force
+            )
 
         df_list.append(df)
 
@@ -1,11 +1,14 @@
 # main.py
 """Main entry point for the Streamlit application."""
 
+import pandas as pd
 import streamlit as st
 
 from data_manager import DataManager
 from ui_components import UIComponents
 
+pd.set_option("mode.copy_on_write", True)
+
 
 def main() -> None:
     """Main application entry point."""
@@ -1,9 +1,11 @@
 # ui_components.py
 """UI components and display logic for the Streamlit application."""
 
-import base64
+import functools
 import math
-from typing import Any, List
+import os
+import re
+from typing import Any, Dict, FrozenSet, List, Tuple, cast
 
 import pandas as pd
 import streamlit as st
@@ -11,24 +13,13 @@ import streamlit as st
 from config import FRAME_LABELS
 from data_manager import DataManager
 
+MARKDOWN_SPECIAL_CHARS = re.compile(r"([\\`*_{}\[\]()#+\-.!|<>~$])")
+"""re.Pattern: Characters with a meaning in Streamlit markdown."""
+
 
 class UIComponents:
     """Class encapsulating UI rendering and interaction logic."""
 
-    @staticmethod
-    def render_img_html(image_path: str) -> None:
-        """Render image from file path as HTML in Streamlit.
-
-        Args:
-            image_path: Path to the image file
-        """
-        with open(image_path, "rb") as f:
-            image_b64 = base64.b64encode(f.read()).decode()
-            st.markdown(
-                f"<img style='max-width:100%max-height:100%;' src='data:image/png;base64,{image_b64}'/>",
-                unsafe_allow_html=True,
-            )
-
     @staticmethod
     def sidebar_controls() -> None:
         """Render sidebar navigation and pagination controls."""
@@ -43,6 +34,7 @@ class UIComponents:
             )
 
             if selected_page != st.session_state.page:
+                DataManager.flush_frame_labels()
                 st.session_state.page = selected_page
                 st.rerun()
 
@@ -96,7 +88,9 @@ class UIComponents:
         st.subheader("Column Display Types")
 
         cols = st.columns(3)
-        for idx, col_name in enumerate(st.session_state.current_df.columns):
+        for idx, col_name in enumerate(
+            DataManager.visible_columns(st.session_state.current_df.columns)
+        ):
             with cols[idx % 3]:
                 current_type = st.session_state.display_types.get(col_name, "Text")
                 st.session_state.display_types[col_name] = st.selectbox(
@@ -108,7 +102,9 @@ class UIComponents:
 
         st.subheader("Column Labels")
         cols = st.columns(3)
-        for idx, col_name in enumerate(st.session_state.current_df.columns):
+        for idx, col_name in enumerate(
+            DataManager.visible_columns(st.session_state.current_df.columns)
+        ):
             with cols[idx % 3]:
                 current_label = st.session_state.labels.get(col_name, col_name)
                 st.session_state.labels[col_name] = st.text_input(
@@ -127,6 +123,7 @@ class UIComponents:
         Returns:
             int: Total number of pages
         """
+        DataManager.flush_frame_labels()
         total_pages = math.ceil(len(df) / st.session_state.rows_per_page)
         with st.sidebar:
             st.write(f"Page {st.session_state.current_page} of {total_pages}")
@@ -136,29 +133,47 @@ class UIComponents:
                 f"of {len(df)} total rows"
             )
 
-            if st.button("Previous") and st.session_state.current_page > 1:
-                st.session_state.current_page -= 1
-                st.rerun()
+            # Callbacks update the page before the rerun, so no second run
+            st.button(
+                "Previous",
+                on_click=UIComponents.change_page,
+                args=(st.session_state.current_page - 1, total_pages),
+            )
 
-            new_page = st.number_input(
+            st.number_input(
                 "Go to page",
                 min_value=1,
                 max_value=total_pages,
                 value=st.session_state.current_page,
                 step=1,
                 key="page_input",
+                on_change=UIComponents.handle_page_input,
             )
 
-            if new_page != st.session_state.current_page:
-                st.session_state.current_page = new_page
-                st.rerun()
-
-            if st.button("Next") and st.session_state.current_page < total_pages:
-                st.session_state.current_page += 1
-                st.rerun()
+            st.button(
+                "Next",
+                on_click=UIComponents.change_page,
+                args=(st.session_state.current_page + 1, total_pages),
+            )
 
         return total_pages
 
+    @staticmethod
+    def change_page(page: int, total_pages: int) -> None:
+        """Go to a page if it is within range.
+
+        Args:
+            page: Number of the requested page
+            total_pages: Total number of pages
+        """
+        if 1 <= page <= total_pages:
+            st.session_state.current_page = page
+
+    @staticmethod
+    def handle_page_input() -> None:
+        """Go to the page entered in the page number input."""
+        st.session_state.current_page = st.session_state.page_input
+
     @staticmethod
     def display_data_preview() -> None:
         """Main entry point for data preview display."""
@@ -167,68 +182,130 @@ class UIComponents:
             st.warning("Upload data first!")
             return
 
+        UIComponents.pagination_controls(st.session_state.current_df)
+        UIComponents.preview_table()
+
+    @staticmethod
+    @st.fragment  # type: ignore[misc]
+    def preview_table() -> None:
+        """Render the sortable, editable table of the current page.
+
+        Sorting and label edits only rerun this fragment instead of the
+        whole app.
+        """
         df = st.session_state.current_df
-        if st.session_state.sort_column:
-            df = UIComponents.sort_dataframe(df)
 
-        UIComponents.pagination_controls(df)
-        column_widths = UIComponents.calc_column_widths(df)
-        UIComponents.display_column_headers(df, column_widths)
+        columns = DataManager.visible_columns(df.columns)
+        display_types = st.session_state.display_types
+        labels = st.session_state.labels
+        col_types = [display_types.get(col, "Text") for col in columns]
+        col_labels = [labels.get(col, col) for col in columns]
+
+        column_widths = UIComponents.calc_column_widths(columns, col_types)
+        UIComponents.display_column_headers(columns, col_labels, column_widths)
 
         start_idx = (st.session_state.current_page - 1) * st.session_state.rows_per_page
         end_idx = start_idx + st.session_state.rows_per_page
-        page_df = df.iloc[start_idx:end_idx]
+        if st.session_state.sort_column:
+            page_df = UIComponents.sort_dataframe(df, start_idx, end_idx)
+        else:
+            page_df = df.iloc[start_idx:end_idx]
+        page_df = DataManager.with_current_labels(page_df)
 
-        for r_idx, row in page_df.iterrows():
+        col_specs = list(zip(columns, col_labels, col_types))
+        for r_idx, *values in page_df.itertuples(index=True, name=None):
+            row = dict(zip(page_df.columns, values))
             cols = st.columns(column_widths)
-            for idx, col_name in enumerate(df.columns):
-                with cols[idx]:
-                    UIComponents.render_column_content(col_name, row, r_idx)
+            for cell, (col_name, label, display_type) in zip(cols, col_specs):
+                with cell:
+                    UIComponents.render_column_content(
+                        col_name, label, display_type, row, r_idx
+                    )
             st.divider()
 
+        DataManager.flush_frame_labels()
+
     @staticmethod
-    def render_column_content(col_name: str, row: pd.Series, r_idx: int) -> None:
+    def render_column_content(
+        col_name: str,
+        label: str,
+        display_type: str,
+        row: Dict[str, Any],
+        r_idx: int,
+    ) -> None:
         """Render individual column content based on display type.
 
         Args:
             col_name: Name of the column
-            row: DataFrame row containing the data
+            label: Display label of the column
+            display_type: Display type of the column
+            row: Mapping from column name to value for the row
             r_idx: Row index in the DataFrame
         """
-        label = st.session_state.labels.get(col_name, col_name)
         value = row[col_name]
-        display_type = st.session_state.display_types.get(col_name, "Text")
-
-        st.markdown(f"**{label}**")
 
         if display_type == "Image":
-            UIComponents.handle_image_display(value)
-        elif col_name == "label":
+            UIComponents.handle_image_display(label, value)
+        elif (
+            col_name == "label"
+            and value in FRAME_LABELS
+            and DataManager.has_frame_uuid(row)
+        ):
+            st.markdown(f"**{label}**")
             UIComponents.handle_label_edit(value, row, r_idx)
-        else:
+        elif isinstance(value, (dict, list)):
+            st.markdown(f"**{label}**")
             st.write(value)
+        else:
+            st.markdown(f"**{label}**  \n{UIComponents.escape_markdown(value)}")
+
+    @staticmethod
+    def escape_markdown(value: Any) -> str:
+        """Format a cell value as literal markdown text.
+
+        Markdown and HTML characters in the data are escaped, so values such
+        as ``a*b`` or ``<NA>`` show as they are instead of as formatting.
+
+        Args:
+            value: Cell value
+
+        Returns:
+            str: Markdown that renders as the value's text
+        """
+        text = MARKDOWN_SPECIAL_CHARS.sub(r"\\\1", str(value))
+        return text.replace("\n", "  \n")
 
     @staticmethod
-    def handle_image_display(value: str) -> None:
+    def handle_image_display(label: str, value: str) -> None:
         """Handle image path(s) display logic.
 
         Args:
+            label: Display label of the column
             value: Comma-separated image paths
         """
+        st.markdown(f"**{label}**")
         try:
-            img_paths = value.split(",")
-            for img_path in img_paths:
-                UIComponents.render_img_html(img_path)
+            for img_path in value.split(","):
+                # A missing file must not hide the other model's image
+                if not os.path.isfile(img_path):
+                    st.write(f"Image not found: {img_path}")
+                    continue
+                # Served as a media URL the browser fetches and caches,
+                # instead of inlining the image data into the page
+                st.image(img_path, use_container_width=True)
         except Exception as e:
             st.write(value)
 
     @staticmethod
-    def handle_label_edit(current_value: str, row: pd.Series, r_idx: int) -> None:
+    def handle_label_edit(current_value: str, row: Dict[str, Any], r_idx: int) -> None:
         """Handle label editing interface.
 
+        The new label is only recorded in ``frame_labels``; the DataFrame is
+        left unchanged so state derived from it stays valid.
+
         Args:
             current_value: Current label value
-            row: DataFrame row being edited
+            row: Mapping from column name to value for the row being edited
             r_idx: Row index in the DataFrame
         """
         new_label = st.selectbox(
@@ -241,56 +318,75 @@ class UIComponents:
         if new_label != current_value:
             frame_uuid = DataManager.get_frame_uuid(row)
             st.session_state.frame_labels[frame_uuid] = new_label
-            DataManager.save_frame_labels()
-            st.session_state.current_df.at[r_idx, "label"] = new_label
+            st.session_state.label_edits += 1
+            st.session_state.labels_dirty = True
 
     @staticmethod
-    def calc_column_widths(df: pd.DataFrame) -> List[float]:
+    def calc_column_widths(columns: List[str], col_types: List[str]) -> List[float]:
         """Calculate column widths based on display types.
 
         Args:
-            df: DataFrame being displayed
+            columns: Column names in display order
+            col_types: Display type of each column
 
         Returns:
             List[float]: List of width ratios for each column
         """
-        n_img_cols = sum(
-            1
-            for col in df.columns
-            if st.session_state.display_types.get(col, "Text") == "Image"
+        img_cols = frozenset(
+            col for col, col_type in zip(columns, col_types) if col_type == "Image"
         )
-        n_non_img = len(df.columns) - n_img_cols
+        return list(UIComponents.column_widths(tuple(columns), img_cols))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def column_widths(
+        columns: Tuple[str, ...], img_cols: FrozenSet[str]
+    ) -> Tuple[float, ...]:
+        """Compute width ratios, cached per column layout.
+
+        Image columns share half of the row width and the remaining columns
+        share the other half.
+
+        Args:
+            columns: Column names in display order
+            img_cols: Names of the columns displayed as images
+
+        Returns:
+            Tuple[float, ...]: Width ratio for each column
+        """
+        n_img_cols = len(img_cols)
+        n_non_img = len(columns) - n_img_cols
 
         img_width = 0.5 / n_img_cols if n_img_cols else 0
         non_img_width = (1 - 0.5) / n_non_img if n_non_img else 0
 
-        return [
-            (
-                img_width
-                if st.session_state.display_types.get(col, "Text") == "Image"
-                else non_img_width
-            )
-            for col in df.columns
-        ]
+        return tuple(img_width if col in img_cols else non_img_width for col in columns)
 
     @staticmethod
-    def display_column_headers(df: pd.DataFrame, column_widths: List[float]) -> None:
+    def display_column_headers(
+        columns: List[str], col_labels: List[str], column_widths: List[float]
+    ) -> None:
         """Render clickable column headers with sorting indicators.
 
         Args:
-            df: DataFrame being displayed
+            columns: Column names in display order
+            col_labels: Display label of each column
             column_widths: List of width ratios for columns
         """
         cols = st.columns(column_widths)
-        for idx, col_name in enumerate(df.columns):
-            with cols[idx]:
-                label = st.session_state.labels.get(col_name, col_name)
-                if st.session_state.sort_column == col_name:
-                    indicator = "▲" if st.session_state.sort_ascending else "▼"
+        sort_column = st.session_state.sort_column
+        indicator = "▲" if st.session_state.sort_ascending else "▼"
+        for cell, col_name, label in zip(cols, columns, col_labels):
+            with cell:
+                if sort_column == col_name:
                     label += f" {indicator}"
 
-                if st.button(label, key=f"sort_{col_name}"):
-                    UIComponents.handle_sort_click(col_name)
+                st.button(
+                    label,
+                    key=f"sort_{col_name}",
+                    on_click=UIComponents.handle_sort_click,
+                    args=(col_name,),
+                )
 
     @staticmethod
     def handle_sort_click(col_name: str) -> None:
@@ -304,26 +400,44 @@ class UIComponents:
         else:
             st.session_state.sort_column = col_name
             st.session_state.sort_ascending = True
-        st.rerun()
 
     @staticmethod
-    def sort_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-        """Sort DataFrame based on current sort configuration.
+    def sort_dataframe(df: pd.DataFrame, start_idx: int, end_idx: int) -> pd.DataFrame:
+        """Return one page of the DataFrame in the current sort order.
+
+        The sorted row order is computed once per frame and sort setting
+        and kept in session state, so paging only slices it. Sorting by
+        ``label`` uses the edited labels and is redone after each edit.
 
         Args:
             df: DataFrame to sort
+            start_idx: Position of the first row on the page
+            end_idx: Position after the last row on the page
 
         Returns:
-            pd.DataFrame: Sorted DataFrame
+            pd.DataFrame: Rows of the requested page in sorted order
 
         Raises:
             ValueError: If sorting fails
         """
         try:
-            return df.sort_values(
-                by=st.session_state.sort_column,
-                ascending=st.session_state.sort_ascending,
-            )
+            column = st.session_state.sort_column
+            ascending = st.session_state.sort_ascending
+            edits = st.session_state.label_edits if column == "label" else None
+            cached = st.session_state.sort_order
+            if (
+                cached is None
+                or cached[0] is not df
+                or cached[1:4] != (column, ascending, edits)
+            ):
+                if column == "label":
+                    sort_key = DataManager.current_labels(df)
+                else:
+                    sort_key = df[column]
+                positions = DataManager.sorted_positions(sort_key, ascending)
+                st.session_state.sort_order = (df, column, ascending, edits, positions)
+            positions = st.session_state.sort_order[4][start_idx:end_idx]
+            return cast(pd.DataFrame, df.iloc[positions])
         except Exception as e:
             st.error(f"Sorting error: {str(e)}")
-            return df
+            return df.iloc[start_idx:end_idx]